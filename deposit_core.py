@@ -0,0 +1,600 @@
+import asyncio
+import logging
+import os
+import random
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from web3 import Web3, AsyncWeb3, AsyncHTTPProvider
+from eth_account import Account
+from web3.exceptions import ContractLogicError, TimeExhausted, TransactionNotFound
+from deposit_loader import (ensure_env, load_deposit_data, successful_deposit_store,
+                            SuccessfulDepositStore, SUCCESSFUL_DEPOSITS_FILE)
+
+logger = logging.getLogger("deposit")
+
+# Settings come from the environment, falling back to .env
+ensure_env()
+
+# Size of the keep-alive connection pools shared by all RPC requests
+HTTP_POOL_SIZE = 16
+
+# Reuse one pooled keep-alive session instead of a new connection per request
+session = requests.Session()
+session.headers["Connection"] = "keep-alive"
+adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=0)
+session.mount("https://", adapter)
+session.mount("http://", adapter)
+
+# Default maximum number of deposits awaiting confirmation against the provider at once
+DEFAULT_MAX_CONCURRENCY = 8
+
+# Clients, chain and wallet state, set by connect() so that importing this
+# module (e.g. for deposit.py --help) never touches the network or the key
+w3: Optional[Web3] = None
+async_w3: Optional[AsyncWeb3] = None
+CHAIN_ID: Optional[int] = None
+BLOCK_TIME: Optional[float] = None
+RECEIPT_POLL_LATENCY: Optional[float] = None
+acct = None
+FROM_ADDRESS: Optional[str] = None
+
+def measure_block_time(sample: int = 10) -> float:
+    """Average block time in seconds over the last `sample` blocks."""
+    latest = w3.eth.get_block('latest')
+    earlier = w3.eth.get_block(max(latest['number'] - sample, 0))
+    return (latest['timestamp'] - earlier['timestamp']) / max(latest['number'] - earlier['number'], 1)
+
+def connect():
+    """Connect to the Hoodi execution client and load the wallet, once per process."""
+    global w3, async_w3, CHAIN_ID, BLOCK_TIME, RECEIPT_POLL_LATENCY, acct, FROM_ADDRESS
+    if w3 is not None:
+        return
+
+    rpc_url = os.getenv("RPC_URL")
+    assert rpc_url, "Missing RPC_URL in environment"
+    w3 = Web3(Web3.HTTPProvider(rpc_url, session=session, request_kwargs={'timeout': 30}))
+    assert w3.is_connected(), "Web3 provider not connected."
+
+    # Async client for the concurrent per-validator send/confirm path
+    async_w3 = AsyncWeb3(AsyncHTTPProvider(rpc_url))
+
+    # Chain id never changes for a given endpoint, fetch it once
+    CHAIN_ID = w3.eth.chain_id
+
+    # Receipts only change once per block, so poll at half the observed block time
+    BLOCK_TIME = measure_block_time()
+    RECEIPT_POLL_LATENCY = max(1, BLOCK_TIME * 0.5)
+
+    # Load private key from environment and derive wallet address; the
+    # account holds the key from here on, so the hex string isn't kept
+    private_key = os.getenv("PRIVATE_KEY")
+    assert private_key, "Missing PRIVATE_KEY in environment"
+    acct = Account.from_key(private_key)
+    FROM_ADDRESS = acct.address
+
+# Deposit contract address on Hoodi
+DEPOSIT_CONTRACT = Web3.to_checksum_address("0x00000000219ab540356cBB839Cbe05303d7705Fa")
+
+# Deposit function selector for deposit(bytes, bytes, bytes, bytes32)
+function_selector = bytes.fromhex("22895118")
+
+# Byte length of each deposit data field, in deposit() argument order
+DEPOSIT_FIELD_SIZES = {
+    "pubkey": 48,
+    "withdrawal_credentials": 32,
+    "signature": 96,
+    "deposit_data_root": 32,
+}
+
+def abi_word(value: int) -> bytes:
+    """Encode an integer as a 32-byte ABI word."""
+    return value.to_bytes(32, "big")
+
+# Matches a plain hex string, used to validate fields without decoding them
+HEX_PATTERN = re.compile(r"[0-9a-fA-F]+")
+
+# deposit() arguments have fixed sizes, so the ABI layout is constant:
+# a 4-word head (three offsets to the dynamic bytes tails, then the inline
+# bytes32 root) followed by the length-prefixed, 32-byte padded tails.
+DEPOSIT_CALLDATA_HEAD = function_selector + abi_word(0x80) + abi_word(0xe0) + abi_word(0x120)
+PUBKEY_LENGTH_WORD = abi_word(48)
+PUBKEY_PADDING = bytes(16)
+WITHDRAWAL_CREDENTIALS_LENGTH_WORD = abi_word(32)
+SIGNATURE_LENGTH_WORD = abi_word(96)
+
+# Amount sent with every deposit
+DEPOSIT_AMOUNT = Web3.to_wei(32, 'ether')
+
+# Headroom added to the one-off deposit gas estimate
+DEPOSIT_GAS_BUFFER = 10_000
+
+# RPC error text for a call that reverts on-chain
+EXECUTION_REVERTED_ERROR = "execution reverted"
+
+# Send error meaning this exact signed transaction is already in the mempool,
+# e.g. from an earlier attempt whose response was lost
+ALREADY_KNOWN_ERROR = "already known"
+
+# Send errors that retrying with higher fees cannot fix
+PERMANENT_SEND_ERRORS = (
+    "insufficient funds",
+    "nonce too low",
+    "intrinsic gas too low",
+    "replacement transaction underpriced",
+)
+
+# Send errors worth retrying with bumped fees
+RETRYABLE_SEND_ERRORS = (
+    "timeout",
+    "timed out",
+    "connection",
+    "txpool is full",
+    "transaction pool is full",
+    "transaction underpriced",
+    "less than block base fee",
+)
+
+# Tip used when the gas price source doesn't provide one, and the fee used
+# when it is unreachable
+DEFAULT_PRIORITY_FEE = Web3.to_wei(2, 'gwei')
+FALLBACK_MAX_FEE = Web3.to_wei(50, 'gwei')
+
+# Retries never raise maxFeePerGas above this
+MAX_FEE_CEILING = Web3.to_wei(500, 'gwei')
+
+# Minimum fee bump (in percent) nodes accept for replacing a pending transaction
+MIN_BUMP_PCT = 10
+
+# Fee bump (in percent) applied on each send retry, with margin over MIN_BUMP_PCT
+DEFAULT_BUMP_PCT = 12.5
+
+# How long to wait for a deposit receipt (seconds)
+RECEIPT_TIMEOUT = 300
+
+class DepositError(Exception):
+    """A condition under which continuing could deposit for a validator twice."""
+
+def save_successful_deposit(pubkey: str, successful: SuccessfulDepositStore):
+    """Record a successfully deposited validator pubkey and append it to the state file.
+
+    Raises DepositError if it can't be written, since a later run would
+    then deposit for the validator again.
+    """
+    try:
+        successful.add([pubkey])
+        successful.flush()
+    except Exception as e:
+        logger.error("✗ Error saving successful deposit for pubkey %s: %s", pubkey, e)
+        raise DepositError(f"could not record the successful deposit for pubkey {pubkey}: {e}") from e
+    logger.debug("Saved successful deposit for pubkey: %s...", pubkey[:10])
+
+def validate_deposit_data(entry: Dict[str, Any]) -> bool:
+    """Validate deposit data entry has all required fields with correct format."""
+    for field, size in DEPOSIT_FIELD_SIZES.items():
+        if field not in entry:
+            logger.warning("Missing required field: %s", field)
+            return False
+        # Validate hex format
+        value = entry[field]
+        if not isinstance(value, str) or not HEX_PATTERN.fullmatch(value):
+            logger.warning("Invalid hex format in field: %s", field)
+            return False
+        if len(value) != size * 2:
+            logger.warning("Field %s must be %d bytes", field, size)
+            return False
+    return True
+
+async def wait_for_transaction(tx_hash: bytes, timeout: float = RECEIPT_TIMEOUT) -> Optional[bool]:
+    """Wait for transaction confirmation.
+
+    Returns whether the transaction succeeded, or None if it is still not
+    mined when `timeout` runs out.
+    """
+    logger.debug("Waiting for transaction confirmation of 0x%s...", tx_hash.hex())
+    # ±20% jitter keeps concurrent waiters from polling in lockstep
+    poll_latency = RECEIPT_POLL_LATENCY * (0.8 + 0.4 * random.random())
+    try:
+        receipt = await async_w3.eth.wait_for_transaction_receipt(
+            tx_hash, timeout=timeout, poll_latency=poll_latency
+        )
+    except TimeExhausted:
+        logger.warning("✗ Transaction confirmation timeout for 0x%s", tx_hash.hex())
+        return None
+    if receipt["status"] == 1:
+        logger.info("✓ Transaction 0x%s confirmed in block %d", tx_hash.hex(), receipt['blockNumber'])
+        return True
+    logger.warning("✗ Transaction 0x%s failed!", tx_hash.hex())
+    return False
+
+def fees_from_fee_history(fee_history) -> Tuple[int, int]:
+    """Derive (maxFeePerGas, maxPriorityFeePerGas) from an eth_feeHistory result."""
+    # Get the base fee for the latest block
+    base_fee = fee_history['baseFeePerGas'][-1]
+
+    # Get the median priority fee from recent blocks
+    priority_fees = [reward[0] for reward in fee_history['reward'] if reward]  # Get median (50th percentile) rewards
+    median_priority_fee = int(sum(priority_fees) / len(priority_fees)) if priority_fees else DEFAULT_PRIORITY_FEE
+
+    # Calculate max fee per gas (base fee + priority fee)
+    return base_fee + median_priority_fee, median_priority_fee
+
+async def fetch_fee_history_gas_price() -> Tuple[int, int]:
+    """Get current (max fee, priority fee) using eth_feeHistory."""
+    try:
+        # Get fee history for the last 5 blocks
+        fee_history = await async_w3.eth.fee_history(
+            block_count=5,
+            newest_block='latest',
+            reward_percentiles=[50, 75, 90]  # Get median, 75th percentile, and 90th percentile
+        )
+        return fees_from_fee_history(fee_history)
+    except Exception as e:
+        logger.warning("Error getting gas price: %s", e)
+        # Fallback to a reasonable default
+        return FALLBACK_MAX_FEE, DEFAULT_PRIORITY_FEE
+
+async def fetch_base_fee_gas_price() -> Tuple[int, int]:
+    """Get current (max fee, priority fee) from the latest base fee and eth_maxPriorityFeePerGas.
+
+    The base fee is doubled so the price stays valid through several
+    blocks of base fee increases. Falls back to eth_feeHistory for
+    providers that don't implement eth_maxPriorityFeePerGas.
+    """
+    try:
+        # Both reads go out as one JSON-RPC batch
+        async with async_w3.batch_requests() as batch:
+            batch.add(async_w3.eth.get_block('latest'))
+            batch.add(async_w3.eth.max_priority_fee)
+            block, priority_fee = await batch.async_execute()
+        return block['baseFeePerGas'] * 2 + priority_fee, priority_fee
+    except Exception as e:
+        logger.warning("Error getting base fee, falling back to eth_feeHistory: %s", e)
+        return await fetch_fee_history_gas_price()
+
+async def fetch_node_gas_price() -> Tuple[int, int]:
+    """Get current (max fee, priority fee) with the max fee suggested by the node via eth_gasPrice."""
+    try:
+        gas_price = await async_w3.eth.gas_price
+    except Exception as e:
+        logger.warning("Error getting gas price: %s", e)
+        # Fallback to a reasonable default
+        gas_price = FALLBACK_MAX_FEE
+    return gas_price, min(DEFAULT_PRIORITY_FEE, gas_price)
+
+# Gas price sources selectable with run_deposits(gas_strategy=...), each
+# returning (maxFeePerGas, maxPriorityFeePerGas)
+GAS_STRATEGIES = {
+    "base_fee": fetch_base_fee_gas_price,
+    "fee_history": fetch_fee_history_gas_price,
+    "gas_price": fetch_node_gas_price,
+}
+DEFAULT_GAS_STRATEGY = "base_fee"
+
+async def bump_fees(tx: dict, bump_pct: float = DEFAULT_BUMP_PCT):
+    """Raise the transaction fees just enough for a replacement to be accepted.
+
+    Nodes require at least a 12.5% bump to replace a pending transaction;
+    maxFeePerGas is also kept above twice the pending base fee.
+    """
+    bump = 1 + bump_pct / 100
+    tx['maxPriorityFeePerGas'] = int(tx['maxPriorityFeePerGas'] * bump) + 1
+    min_fee = tx['maxPriorityFeePerGas']
+    try:
+        pending_block = await async_w3.eth.get_block('pending')
+        min_fee += pending_block['baseFeePerGas'] * 2
+    except Exception as e:
+        logger.warning("Error getting pending base fee: %s", e)
+    tx['maxFeePerGas'] = max(int(tx['maxFeePerGas'] * bump) + 1, min_fee)
+
+def sign_transaction(tx: dict) -> bytes:
+    """Sign a transaction with the wallet key, returning the raw transaction."""
+    return acct.sign_transaction(tx).raw_transaction
+
+def is_revert_error(e: Exception) -> bool:
+    """Tell whether a call failed because it would revert, rather than in transport."""
+    return isinstance(e, ContractLogicError) or EXECUTION_REVERTED_ERROR in str(e).lower()
+
+def is_retryable_send_error(e: Exception) -> bool:
+    """Tell whether a failed send may succeed if retried with higher fees."""
+    if isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    message = str(e).lower()
+    if any(err in message for err in PERMANENT_SEND_ERRORS):
+        return False
+    return any(err in message for err in RETRYABLE_SEND_ERRORS)
+
+async def send_transaction(tx: dict, bump_pct: float = DEFAULT_BUMP_PCT, max_retries: int = 3,
+                           raw_transaction: Optional[bytes] = None) -> bytes:
+    """Send transaction with retry logic.
+
+    `raw_transaction` is the already signed `tx`, if available; retries
+    re-sign after bumping the fees. Only transient errors are retried,
+    and never past MAX_FEE_CEILING. A transaction the node already has
+    counts as sent.
+    """
+    for attempt in range(max_retries):
+        try:
+            # Sign (unless pre-signed) and send transaction
+            if raw_transaction is None:
+                raw_transaction = sign_transaction(tx)
+            tx_hash = await async_w3.eth.send_raw_transaction(raw_transaction)
+            logger.info("Transaction sent: 0x%s (nonce %d, gas price %.2f Gwei)",
+                        tx_hash.hex(), tx['nonce'], Web3.from_wei(tx['maxFeePerGas'], 'gwei'))
+            return tx_hash
+        except Exception as e:
+            if ALREADY_KNOWN_ERROR in str(e).lower():
+                # It will still be mined, so track it by its hash like any sent transaction
+                tx_hash = Web3.keccak(raw_transaction)
+                logger.info("Transaction already known: 0x%s (nonce %d)", tx_hash.hex(), tx['nonce'])
+                return tx_hash
+            if not is_retryable_send_error(e):
+                raise
+            if attempt < max_retries - 1:
+                # Increase gas price by the minimum replacement bump for next attempt
+                await bump_fees(tx, bump_pct)
+                if tx['maxFeePerGas'] > MAX_FEE_CEILING:
+                    logger.error("Gas price %.2f Gwei exceeds ceiling, giving up", Web3.from_wei(tx['maxFeePerGas'], 'gwei'))
+                    raise
+                raw_transaction = None
+                # Back off exponentially to allow network to stabilize
+                await asyncio.sleep(2 ** attempt)
+            else:
+                logger.error("Failed to send transaction after %d attempts", max_retries)
+                raise
+    raise Exception("Failed to send transaction after all retries")
+
+def decode_deposit_fields(entries: List[Dict[str, Any]]) -> List[Tuple[bytes, ...]]:
+    """Hex-decode the deposit fields of validated entries.
+
+    Each field is decoded for all entries with a single bytes.fromhex call
+    over the concatenated column, then sliced at its fixed size.
+    """
+    columns = []
+    for field, size in DEPOSIT_FIELD_SIZES.items():
+        column = bytes.fromhex("".join(entry[field] for entry in entries))
+        columns.append([column[j:j + size] for j in range(0, len(column), size)])
+    return list(zip(*columns))
+
+def build_calldata(pubkey: bytes, withdrawal_credentials: bytes, signature: bytes, deposit_data_root: bytes) -> bytes:
+    """ABI-encode the deposit() call for decoded deposit fields.
+
+    Equivalent to eth_abi.encode(["bytes", "bytes", "bytes", "bytes32"], ...)
+    for the fixed field sizes checked by validate_deposit_data().
+    """
+    return b"".join((
+        DEPOSIT_CALLDATA_HEAD, deposit_data_root,
+        PUBKEY_LENGTH_WORD, pubkey, PUBKEY_PADDING,
+        WITHDRAWAL_CREDENTIALS_LENGTH_WORD, withdrawal_credentials,
+        SIGNATURE_LENGTH_WORD, signature,
+    ))
+
+async def estimate_deposit_gas(calldata: bytes) -> int:
+    """Estimate the gas limit for a deposit, with a fixed safety buffer."""
+    estimated_gas = await async_w3.eth.estimate_gas({
+        'from': FROM_ADDRESS,
+        'to': DEPOSIT_CONTRACT,
+        'value': DEPOSIT_AMOUNT,
+        'data': calldata,
+    })
+    return estimated_gas + DEPOSIT_GAS_BUFFER
+
+def prepare_tx(calldata: bytes, nonce: int, deposit_gas: int, max_fee_per_gas: int,
+               max_priority_fee_per_gas: int) -> dict:
+    """Build the deposit transaction for precomputed calldata.
+
+    Every deposit has the same calldata shape, so the gas limit estimated
+    once per run is reused. The priority fee is capped at the max fee,
+    which nodes require.
+    """
+    return {
+        'type': 2,
+        'chainId': CHAIN_ID,
+        'from': FROM_ADDRESS,
+        'to': DEPOSIT_CONTRACT,
+        'nonce': nonce,
+        'value': DEPOSIT_AMOUNT,
+        'data': calldata,
+        'gas': deposit_gas,
+        'maxFeePerGas': max_fee_per_gas,
+        'maxPriorityFeePerGas': min(max_priority_fee_per_gas, max_fee_per_gas),
+    }
+
+async def confirm_deposit(i: int, pubkey: str, tx_hash: bytes, semaphore: asyncio.Semaphore,
+                          successful: SuccessfulDepositStore) -> Optional[bool]:
+    """Wait for one sent deposit to be mined and record it if it succeeded.
+
+    Returns None if the deposit is still unmined after RECEIPT_TIMEOUT.
+    """
+    async with semaphore:
+        try:
+            confirmed = await wait_for_transaction(tx_hash)
+        except Exception as e:
+            logger.error("✗ Transaction failed for validator %d: %s", i + 1, e)
+            return False
+        if confirmed:
+            logger.info("✓ Successfully deposited validator %d", i + 1)
+            # Save successful deposit
+            save_successful_deposit(pubkey, successful)
+        elif confirmed is False:
+            logger.error("✗ Failed to confirm deposit for validator %d", i + 1)
+        return confirmed
+
+async def recheck_deposit(i: int, pubkey: str, tx_hash: bytes, successful: SuccessfulDepositStore) -> Optional[bool]:
+    """Look up the receipt of a deposit whose confirmation timed out, once more.
+
+    Returns None if it is still unmined.
+    """
+    try:
+        receipt = await async_w3.eth.get_transaction_receipt(tx_hash)
+    except TransactionNotFound:
+        logger.error("✗ Deposit for validator %d (0x%s) is still pending. Check it on-chain and record "
+                     "pubkey %s before running again, or it may be deposited twice.", i + 1, tx_hash.hex(), pubkey)
+        return None
+    if receipt["status"] == 1:
+        logger.info("✓ Successfully deposited validator %d", i + 1)
+        save_successful_deposit(pubkey, successful)
+        return True
+    logger.error("✗ Failed to confirm deposit for validator %d", i + 1)
+    return False
+
+async def process_validators(pending: list, nonce_base: int, balance: int, gas_strategy: str,
+                             bump_pct: float, successful: SuccessfulDepositStore,
+                             max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> int:
+    """Send the pending deposits in nonce order and confirm them concurrently, returning the success count."""
+    connector = aiohttp.TCPConnector(limit=HTTP_POOL_SIZE, keepalive_timeout=75)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=30)) as async_session:
+        # Route every async request through the pooled keep-alive session
+        await async_w3.provider.cache_async_session(async_session)
+
+        # Estimate gas once for the whole batch; entries whose estimation
+        # reverts would revert on-chain, so they are dropped before nonces are
+        # assigned. Any other failure (timeout, rate limit, ...) aborts the run
+        # rather than discarding validators that are fine.
+        deposit_gas = None
+        while pending and deposit_gas is None:
+            i, _, calldata = pending[0]
+            try:
+                deposit_gas = await estimate_deposit_gas(calldata)
+            except Exception as e:
+                if not is_revert_error(e):
+                    raise
+                logger.warning("Gas estimation reverted for validator %d, skipping it: %s", i + 1, e)
+                pending = pending[1:]
+        if deposit_gas is None:
+            return 0
+
+        # Price the whole batch once, up front
+        max_fee_per_gas, max_priority_fee_per_gas = await GAS_STRATEGIES[gas_strategy]()
+
+        # Reserve the worst-case gas of every deposit alongside its 32 ETH, so
+        # the last deposits don't fail for insufficient funds and leave a nonce gap
+        affordable = balance // (DEPOSIT_AMOUNT + deposit_gas * max_fee_per_gas)
+        if len(pending) > affordable:
+            logger.info("Insufficient funds to cover gas for every deposit. Processing %d of %d validators.",
+                        affordable, len(pending))
+            pending = pending[:affordable]
+
+        # Nonces are pre-allocated so every transaction can be signed up front
+        txs = [
+            prepare_tx(calldata, nonce_base + n, deposit_gas, max_fee_per_gas, max_priority_fee_per_gas)
+            for n, (_, _, calldata) in enumerate(pending)
+        ]
+        # Signing is CPU-bound, so sign the whole batch in parallel before broadcasting
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            raw_transactions = list(executor.map(sign_transaction, txs))
+
+        # Send in nonce order, confirming each deposit in the background as soon
+        # as it is sent. Once a nonce fails to send, every higher nonce would sit
+        # queued behind the gap, be reported failed, and still be mined once the
+        # gap is filled later without ever being recorded, so stop sending there.
+        semaphore = asyncio.Semaphore(max_concurrency)
+        sent = []
+        confirmations = []
+        for n, ((i, pubkey, _), tx, raw_transaction) in enumerate(zip(pending, txs, raw_transactions)):
+            # Every confirmed deposit must be on disk before more are sent
+            if any(task.done() and task.exception() is not None for task in confirmations):
+                logger.error("Not sending the remaining %d deposits: a successful deposit could not be recorded",
+                             len(pending) - n)
+                break
+            try:
+                tx_hash = await send_transaction(tx, bump_pct, raw_transaction=raw_transaction)
+            except Exception as e:
+                logger.error("✗ Transaction failed for validator %d: %s", i + 1, e)
+                if n + 1 < len(pending):
+                    logger.error("Not sending the remaining %d deposits after the failed nonce %d",
+                                 len(pending) - n - 1, tx['nonce'])
+                break
+            sent.append((i, pubkey, tx_hash))
+            confirmations.append(asyncio.ensure_future(confirm_deposit(i, pubkey, tx_hash, semaphore, successful)))
+        # Let every sent deposit finish confirming, even if recording one failed
+        results = await asyncio.gather(*confirmations, return_exceptions=True)
+
+        # A timed-out deposit still holds its nonce in the mempool and will be
+        # mined eventually. Look again now that every later nonce has resolved;
+        # if one of those was mined, this one necessarily was too.
+        for n, ((i, pubkey, tx_hash), confirmed) in enumerate(zip(sent, results)):
+            if confirmed is None:
+                results[n] = await recheck_deposit(i, pubkey, tx_hash, successful)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        if None in results:
+            raise DepositError("Some deposits are still pending; not all successful deposits could be recorded")
+        return sum(results)
+
+def run_deposits(gas_strategy: str = DEFAULT_GAS_STRATEGY, bump_pct: float = DEFAULT_BUMP_PCT,
+                 state_file: str = SUCCESSFUL_DEPOSITS_FILE,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> int:
+    """Deposit 32 ETH for every pending validator the wallet can fund.
+
+    `gas_strategy` selects the gas price source from GAS_STRATEGIES,
+    `bump_pct` is the fee increase applied on each send retry,
+    `state_file` is the sorted binary file tracking successful deposits and
+    `max_concurrency` caps the deposits awaiting confirmation at once.
+    Returns the number of validators deposited.
+    """
+    connect()
+    logger.info("Using wallet address: %s", FROM_ADDRESS)
+
+    # Load deposit data; a missing or malformed file aborts with its traceback
+    deposit_data = load_deposit_data()
+
+    # Validate and encode every entry once, before any transaction is prepared
+    valid = []
+
+    for i, entry in enumerate(deposit_data):
+        if not validate_deposit_data(entry):
+            logger.warning("Skipping invalid deposit data for validator %d", i + 1)
+            continue
+        valid.append((i, entry))
+
+    decoded = decode_deposit_fields([entry for _, entry in valid])
+    precomputed = [
+        (i, entry["pubkey"], build_calldata(*fields))
+        for (i, entry), fields in zip(valid, decoded)
+    ]
+
+    # Load successful deposits
+    successful_deposits = successful_deposit_store(state_file)
+    logger.info("Found %d previously successful deposits", len(successful_deposits))
+
+    # Check wallet balance
+    balance = w3.eth.get_balance(FROM_ADDRESS)
+    # Upper bound before gas, which is reserved once the batch is priced
+    max_validators = balance // DEPOSIT_AMOUNT
+    logger.info("Wallet balance: %s ETH", Web3.from_wei(balance, 'ether'))
+    logger.info("Can process up to %d validators", max_validators)
+
+    # Select the validators to deposit for before dispatching any transaction
+    pending = []
+
+    for i, pubkey, calldata in precomputed:
+        # Skip if already successfully deposited
+        if pubkey in successful_deposits:
+            logger.info("Skipping validator %d - already successfully deposited", i + 1)
+            continue
+
+        # Check if we've selected enough non-deposited validators
+        if len(pending) >= max_validators:
+            logger.info("Insufficient funds to process more validators. Stopping at validator %d.", i + 1)
+            break
+
+        pending.append((i, pubkey, calldata))
+
+    logger.info("Processing %d validators (up to %d at a time)", len(pending), max_concurrency)
+    # Deposits from an earlier run still in the mempool would be mined
+    # alongside fresh ones for the same pubkeys under new nonces, so only
+    # start once every transaction from this wallet is mined
+    nonce_base = w3.eth.get_transaction_count(FROM_ADDRESS, "latest")
+    pending_count = w3.eth.get_transaction_count(FROM_ADDRESS, "pending") - nonce_base
+    if pending_count:
+        raise DepositError(f"{pending_count} transaction(s) from {FROM_ADDRESS} are still pending; "
+                           f"wait for them to be mined before running again")
+    processed_count = asyncio.run(process_validators(pending, nonce_base, balance, gas_strategy, bump_pct,
+                                                     successful_deposits, max_concurrency))
+    logger.info("Deposited %d/%d validators", processed_count, len(pending))
+    return processed_count
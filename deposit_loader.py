@@ -0,0 +1,192 @@
+import bisect
+import functools
+import itertools
+import logging
+import mmap
+import os
+from typing import Any, Dict, Iterator, List
+import ijson
+import orjson
+
+logger = logging.getLogger("deposit")
+
+# File tracking successful deposits: raw 48-byte pubkeys, a sorted run
+# followed by any records appended since it was last compacted
+SUCCESSFUL_DEPOSITS_FILE = "successful_deposits.sorted.bin"
+
+# Size of one BLS validator pubkey record
+PUBKEY_SIZE = 48
+
+# Original JSON array format, still read so existing state is honoured
+LEGACY_SUCCESSFUL_DEPOSITS_FILE = "successful_deposits.json"
+
+# Optional file of KEY=value lines, read from the working directory
+ENV_FILE = ".env"
+
+_ENV_LOADED = False
+
+def _load_env_file(path: str = ENV_FILE):
+    """Set variables from a .env file without overriding exported ones."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#") or "=" not in line:
+                    continue
+                key, value = line.removeprefix("export ").split("=", 1)
+                os.environ.setdefault(key.strip(), value.strip().strip("'\""))
+    except FileNotFoundError:
+        pass
+
+def ensure_env():
+    """Load .env once per process; exported variables take precedence over it."""
+    global _ENV_LOADED
+    if not _ENV_LOADED:
+        _load_env_file()
+        _ENV_LOADED = True
+
+@functools.lru_cache(maxsize=1)
+def deposit_data_path() -> str:
+    """Return the deposit data file configured in the environment, looked up once."""
+    ensure_env()
+    deposit_data_file = os.getenv("DEPOSIT_DATA_FILE")
+    assert deposit_data_file, "Missing DEPOSIT_DATA_FILE in environment"
+    return deposit_data_file
+
+@functools.lru_cache(maxsize=1)
+def load_deposit_data() -> List[Dict[str, Any]]:
+    """Parse the whole deposit data file, at most once per process."""
+    # Parse straight out of the page cache; orjson reads the mapped buffer
+    # without first copying the file into a bytes object
+    with open(deposit_data_path(), 'rb', buffering=0) as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+        deposit_data = orjson.loads(view)
+    # Exact type check; orjson only ever returns a plain list for a JSON array
+    if type(deposit_data) is not list:
+        raise ValueError("Deposit data must be a list")
+    return deposit_data
+
+def iter_deposit_data() -> Iterator[Dict[str, Any]]:
+    """Stream deposit data entries without parsing the rest of the file."""
+    with open(deposit_data_path(), 'rb') as f:
+        events = ijson.parse(f)
+        # items() would silently yield nothing for a document that isn't an array
+        first = next(events, None)
+        if first is None or first[1] != 'start_array':
+            raise ValueError("Deposit data must be a list")
+        yield from ijson.items(itertools.chain([first], events), 'item')
+
+def _read_bytes(path: str) -> bytes:
+    """Read a whole file in one unbuffered read, or b"" if it doesn't exist."""
+    # Opening directly saves the stat of an os.path.exists() check
+    try:
+        with open(path, 'rb', buffering=0) as f:
+            return f.read()
+    except FileNotFoundError:
+        return b""
+
+def pubkey_bytes(pubkey: str) -> bytes:
+    """Decode a hex validator pubkey, with or without 0x prefix, to its raw record."""
+    record = bytes.fromhex(pubkey[2:] if pubkey.startswith(("0x", "0X")) else pubkey)
+    # Every record must be exactly PUBKEY_SIZE bytes on disk
+    if len(record) != PUBKEY_SIZE:
+        raise ValueError(f"Pubkey must be {PUBKEY_SIZE} bytes, got {len(record)}")
+    return record
+
+def _split_records(buf: bytes) -> List[bytes]:
+    """Split a packed buffer into its 48-byte records."""
+    return [buf[i:i + PUBKEY_SIZE] for i in range(0, len(buf), PUBKEY_SIZE)]
+
+class SuccessfulDepositStore:
+    """Set of successfully deposited validator pubkeys, kept as sorted packed records.
+
+    Loading is one read with no per-pubkey objects; only the records
+    appended since the last load are sorted and inserted into the sorted
+    run, and the file compacted once. Membership is a binary search, add()
+    inserts new pubkeys in place and flush() appends them to the file. A file that can't be read raises rather than being
+    treated as empty, since that would mean depositing again.
+    """
+
+    def __init__(self, path: str = SUCCESSFUL_DEPOSITS_FILE):
+        self.path = path
+        self._unflushed = []
+        buf = _read_bytes(path)
+        # A torn record from a crash mid-append; the pubkey it held is unknown
+        if len(buf) % PUBKEY_SIZE:
+            raise ValueError(f"{path} is not a whole number of {PUBKEY_SIZE}-byte pubkey records")
+        self._records = bytearray(buf)
+        end = self._sorted_run_end()
+        if end < len(buf):
+            # Insert just the records appended since the last compaction
+            del self._records[end:]
+            for record in sorted(set(_split_records(buf[end:]))):
+                if not self._contains_record(record):
+                    offset = self._index(record)
+                    self._records[offset:offset] = record
+            self._compact()
+        # Migrate entries from the original JSON format; they are appended on the next flush
+        legacy_json = _read_bytes(LEGACY_SUCCESSFUL_DEPOSITS_FILE)
+        if legacy_json:
+            self.add(orjson.loads(legacy_json))
+
+    def _sorted_run_end(self) -> int:
+        """Offset where the strictly ascending run of records at the start ends."""
+        records = self._records
+        for i in range(PUBKEY_SIZE, len(records), PUBKEY_SIZE):
+            if not records[i - PUBKEY_SIZE:i] < records[i:i + PUBKEY_SIZE]:
+                return i
+        return len(records)
+
+    def _compact(self):
+        """Atomically rewrite the file as the sorted in-memory records."""
+        # Write a temp file and swap it in, so a crash never leaves a partial file
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self._records)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        logger.debug("Compacted %d successful deposits in %s", len(self), self.path)
+
+    def _index(self, record: bytes) -> int:
+        """Binary search for the offset where record is, or would be inserted."""
+        records = self._records
+        i = bisect.bisect_left(range(len(self)), record,
+                               key=lambda n: records[n * PUBKEY_SIZE:(n + 1) * PUBKEY_SIZE])
+        return i * PUBKEY_SIZE
+
+    def _contains_record(self, record: bytes) -> bool:
+        offset = self._index(record)
+        return self._records[offset:offset + PUBKEY_SIZE] == record
+
+    def __contains__(self, pubkey):
+        return self._contains_record(pubkey_bytes(pubkey))
+
+    def __len__(self):
+        return len(self._records) // PUBKEY_SIZE
+
+    def add(self, pubkeys):
+        """Record a batch of successfully deposited validator pubkeys."""
+        new = {record for record in map(pubkey_bytes, pubkeys) if not self._contains_record(record)}
+        if not new:
+            return
+        for record in new:
+            offset = self._index(record)
+            self._records[offset:offset] = record
+        self._unflushed.extend(new)
+
+    def flush(self):
+        """Durably append the pubkeys recorded since the last flush to the file."""
+        if not self._unflushed:
+            return
+        with open(self.path, 'ab') as f:
+            f.write(b"".join(self._unflushed))
+            f.flush()
+            # Make sure the records survive a crash before the next deposit
+            os.fsync(f.fileno())
+        self._unflushed = []
+
+@functools.lru_cache(maxsize=None)
+def successful_deposit_store(path: str = SUCCESSFUL_DEPOSITS_FILE) -> SuccessfulDepositStore:
+    """Return the process-wide store for `path`, reading the file only once."""
+    return SuccessfulDepositStore(path)
@@ -1,17 +1,33 @@
+import json
+import os
 from web3 import Web3
 
+WALLET_FILE = "wallet.json"
+
+# Create the wallet file owner-only, refusing to overwrite an existing wallet
+try:
+    fd = os.open(WALLET_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+except FileExistsError:
+    print(f"{WALLET_FILE} already exists, refusing to overwrite it")
+    exit(1)
+
 # Create a new Ethereum account
 w3 = Web3()
 account = w3.eth.account.create()
 
+# Save private key securely before showing it, so a failed write never
+# leaves a key that was printed but not stored
+try:
+    with os.fdopen(fd, "w") as f:
+        f.write(json.dumps({"address": account.address, "private_key": account.key.hex()}))
+except OSError as e:
+    # Don't leave an empty or partial wallet file blocking the next attempt
+    os.unlink(WALLET_FILE)
+    print(f"Error saving wallet to {WALLET_FILE}: {e}")
+    exit(1)
+
 # Display wallet details
 print("New Wallet Generated:")
 print(f"Address: {account.address}")
 print(f"Private Key: {account.key.hex()}")
-
-# Save private key securely
-with open("wallet.json", "w") as f:
-    f.write(f'{{"address": "{account.address}", "private_key": "{account.key.hex()}"}}')
-
-print("Wallet saved to wallet.json")
-
+print(f"Wallet saved to {WALLET_FILE}")
@@ -1,55 +1,35 @@
-import json
-import os
-from dotenv import load_dotenv
+import itertools
+from typing import List
+from deposit_loader import iter_deposit_data, successful_deposit_store
 
-# Load environment variables
-load_dotenv()
+# Number of leading validators to mark as successfully deposited
+POPULATE_COUNT = 10
 
-# File to track successful deposits
-SUCCESSFUL_DEPOSITS_FILE = "successful_deposits.json"
+def first_pubkeys(count: int = POPULATE_COUNT) -> List[str]:
+    """Return the pubkeys of the first `count` validators in the deposit data file."""
+    # Stream into a list sized once up front, without parsing the rest of the file
+    pubkeys = [None] * count
+    n = 0
+    for n, entry in enumerate(itertools.islice(iter_deposit_data(), count), 1):
+        pubkeys[n - 1] = entry["pubkey"]
+    # The file may hold fewer entries than requested
+    del pubkeys[n:]
+    return pubkeys
 
-def load_successful_deposits():
-    """Load the set of successfully deposited validator pubkeys."""
-    try:
-        if os.path.exists(SUCCESSFUL_DEPOSITS_FILE):
-            with open(SUCCESSFUL_DEPOSITS_FILE, 'r') as f:
-                return set(json.load(f))
-    except Exception as e:
-        print(f"Error loading successful deposits: {e}")
-    return set()
+def main():
+    """Mark the first validators in the deposit data file as successfully deposited."""
+    successful_deposits = first_pubkeys()
 
-def save_successful_deposits(pubkeys):
-    """Save a list of successfully deposited validator pubkeys."""
+    # Save to successful_deposits.sorted.bin
+    store = successful_deposit_store()
     try:
-        # Load existing successful deposits
-        successful = load_successful_deposits()
-        
-        # Add the new pubkeys
-        successful.update(pubkeys)
-        
-        # Save back to file
-        with open(SUCCESSFUL_DEPOSITS_FILE, 'w') as f:
-            json.dump(list(successful), f)
-        print(f"Successfully saved {len(pubkeys)} validator pubkeys to {SUCCESSFUL_DEPOSITS_FILE}")
-        print(f"Total successful deposits: {len(successful)}")
+        store.add(successful_deposits)
+        store.flush()
     except Exception as e:
         print(f"Error saving successful deposits: {e}")
         exit(1)
+    print(f"Successfully saved {len(successful_deposits)} validator pubkeys to {store.path}")
+    print(f"Total successful deposits: {len(store)}")
 
-# Load deposit data
-try:
-    deposit_data_file = os.getenv("DEPOSIT_DATA_FILE")
-    assert deposit_data_file, "Missing DEPOSIT_DATA_FILE in environment"
-    with open(deposit_data_file) as f:
-        deposit_data = json.load(f)
-    if not isinstance(deposit_data, list):
-        raise ValueError("Deposit data must be a list")
-except Exception as e:
-    print(f"Error loading deposit data: {str(e)}")
-    exit(1)
-
-# Get pubkeys of first 10 validators
-successful_deposits = [entry["pubkey"] for entry in deposit_data[:10]]
-
-# Save to successful_deposits.json
-save_successful_deposits(successful_deposits) 
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+import os
+from eth_abi import encode
+from deposit_core import DEPOSIT_FIELD_SIZES, build_calldata, decode_deposit_fields, function_selector
+
+# deposit(bytes pubkey, bytes withdrawal_credentials, bytes signature, bytes32 deposit_data_root)
+DEPOSIT_ARG_TYPES = ["bytes", "bytes", "bytes", "bytes32"]
+
+def random_entry() -> dict:
+    """A deposit data entry with random, correctly sized hex fields."""
+    return {field: os.urandom(size).hex() for field, size in DEPOSIT_FIELD_SIZES.items()}
+
+def test_build_calldata_matches_eth_abi():
+    entries = [random_entry() for _ in range(200)]
+    for fields in decode_deposit_fields(entries):
+        assert build_calldata(*fields) == function_selector + encode(DEPOSIT_ARG_TYPES, list(fields))
+
+def test_decode_deposit_fields_keeps_entry_order():
+    entries = [random_entry() for _ in range(5)]
+    decoded = decode_deposit_fields(entries)
+    assert [[field.hex() for field in fields] for fields in decoded] == \
+        [[entry[field] for field in DEPOSIT_FIELD_SIZES] for entry in entries]
@@ -0,0 +1,80 @@
+import orjson
+import pytest
+from deposit_loader import LEGACY_SUCCESSFUL_DEPOSITS_FILE, PUBKEY_SIZE, SuccessfulDepositStore
+
+def pubkey(n: int) -> str:
+    """A distinct, deterministic 48-byte pubkey in hex; orders like n."""
+    return bytes([n]).hex() * PUBKEY_SIZE
+
+@pytest.fixture
+def state_file(tmp_path, monkeypatch):
+    # The legacy JSON file is looked up in the working directory
+    monkeypatch.chdir(tmp_path)
+    return str(tmp_path / "successful_deposits.sorted.bin")
+
+def read_records(path: str) -> list:
+    with open(path, 'rb') as f:
+        buf = f.read()
+    return [buf[i:i + PUBKEY_SIZE] for i in range(0, len(buf), PUBKEY_SIZE)]
+
+def test_round_trip(state_file):
+    store = SuccessfulDepositStore(state_file)
+    store.add([pubkey(3), pubkey(1)])
+    store.flush()
+    store.add([pubkey(2)])
+    store.flush()
+
+    reloaded = SuccessfulDepositStore(state_file)
+    assert len(reloaded) == 3
+    assert all(pubkey(n) in reloaded for n in (1, 2, 3))
+    assert pubkey(4) not in reloaded
+
+def test_deduplicates_within_and_across_batches(state_file):
+    store = SuccessfulDepositStore(state_file)
+    store.add([pubkey(1), pubkey(1), pubkey(2)])
+    store.flush()
+    store.add([pubkey(2), pubkey(1)])
+    store.flush()
+
+    assert len(store) == 2
+    # Appended in flush order; sorted on the next load
+    assert sorted(read_records(state_file)) == [bytes([1]) * PUBKEY_SIZE, bytes([2]) * PUBKEY_SIZE]
+
+def test_appended_tail_is_sorted_in_and_compacted(state_file):
+    store = SuccessfulDepositStore(state_file)
+    store.add([pubkey(2), pubkey(4), pubkey(6)])
+    store.flush()
+    # Appended in deposit order, so out of order and behind the sorted run
+    for n in (5, 1, 4):
+        store.add([pubkey(n)])
+        store.flush()
+    assert read_records(state_file) != sorted(read_records(state_file))
+
+    reloaded = SuccessfulDepositStore(state_file)
+    expected = [bytes([n]) * PUBKEY_SIZE for n in (1, 2, 4, 5, 6)]
+    assert len(reloaded) == 5
+    assert all(pubkey(n) in reloaded for n in (1, 2, 4, 5, 6))
+    assert read_records(state_file) == expected
+
+def test_migrates_legacy_json(state_file):
+    with open(LEGACY_SUCCESSFUL_DEPOSITS_FILE, 'wb') as f:
+        f.write(orjson.dumps(["0x" + pubkey(7).upper(), pubkey(3)]))
+
+    store = SuccessfulDepositStore(state_file)
+    assert pubkey(7) in store and pubkey(3) in store
+    store.flush()
+    assert sorted(read_records(state_file)) == [bytes([3]) * PUBKEY_SIZE, bytes([7]) * PUBKEY_SIZE]
+
+def test_normalises_prefix_and_case(state_file):
+    store = SuccessfulDepositStore(state_file)
+    store.add(["0x" + pubkey(10).upper()])
+    assert pubkey(10) in store
+    assert "0X" + pubkey(10) in store
+    store.add([pubkey(10)])
+    assert len(store) == 1
+
+def test_torn_record_raises(state_file):
+    with open(state_file, 'wb') as f:
+        f.write(bytes(PUBKEY_SIZE + 5))
+    with pytest.raises(ValueError):
+        SuccessfulDepositStore(state_file)